@@ -6,11 +6,13 @@ from __future__ import print_function
 
 __version__ = "2.0.26"
 
+import functools
+import logging
 import os
 import sys
 import timeit
 
-from knack.arguments import ArgumentsContext
+from knack.arguments import ArgumentsContext, CLIArgumentType
 from knack.cli import CLI
 from knack.commands import CLICommandsLoader
 from knack.completion import ARGCOMPLETE_ENV_NAME
@@ -25,18 +27,17 @@ logger = get_logger(__name__)
 EXCLUDED_PARAMS = ['self', 'raw', 'custom_headers', 'operation_config', 'content_version', 'kwargs', 'client']
 
 
+def _add_id_parameters(cli_ctx, **kwargs):
+    from azure.cli.core.commands.arm import add_id_parameters
+    add_id_parameters(cli_ctx, **kwargs)
+
+
 class AzCli(CLI):
 
     def __init__(self, **kwargs):
         super(AzCli, self).__init__(**kwargs)
 
-        from azure.cli.core.commands.arm import add_id_parameters
-        from azure.cli.core.cloud import get_active_cloud
-        from azure.cli.core.extensions import register_extensions
-        from azure.cli.core._session import ACCOUNT, CONFIG, SESSION
-
         import knack.events as events
-        from knack.util import ensure_dir
 
         self.data['headers'] = {}
         self.data['command'] = 'unknown'
@@ -44,18 +45,55 @@ class AzCli(CLI):
         self.data['completer_active'] = ARGCOMPLETE_ENV_NAME in os.environ
         self.data['query_active'] = False
 
+        # The session files, the active cloud and the extensions are loaded on first use so that
+        # short-lived invocations such as `az --version` don't pay for them.
+        self._cloud = None
+        self._session_loaded = False
+
+        self.register_event(events.EVENT_INVOKER_POST_CMD_TBL_CREATE, _add_id_parameters)
+
+        self.progress_controller = None
+
+    @property
+    def cloud(self):
+        if self._cloud is None:
+            self._ensure_session_loaded()
+        return self._cloud
+
+    @cloud.setter
+    def cloud(self, value):
+        self._cloud = value
+
+    @property
+    def session_loaded(self):
+        return self._session_loaded
+
+    def _ensure_session_loaded(self):
+        if self._session_loaded:
+            return
+
+        from azure.cli.core.cloud import get_active_cloud
+        from azure.cli.core.extensions import register_extensions
+        from azure.cli.core._session import ACCOUNT, CONFIG, SESSION, INDEX
+        from knack.util import ensure_dir
+
         azure_folder = self.config.config_dir
         ensure_dir(azure_folder)
         ACCOUNT.load(os.path.join(azure_folder, 'azureProfile.json'))
         CONFIG.load(os.path.join(azure_folder, 'az.json'))
         SESSION.load(os.path.join(azure_folder, 'az.sess'), max_age=3600)
-        self.cloud = get_active_cloud(self)
-        logger.debug('Current cloud config:\n%s', str(self.cloud.name))
+        INDEX.load(os.path.join(azure_folder, 'commandIndex.json'))
+        if self._cloud is None:
+            self._cloud = get_active_cloud(self)
+        self._session_loaded = True
+        logger.debug('Current cloud config:\n%s', str(self._cloud.name))
 
         register_extensions(self)
-        self.register_event(events.EVENT_INVOKER_POST_CMD_TBL_CREATE, add_id_parameters)
 
-        self.progress_controller = None
+    def invoke(self, args, initial_invocation_data=None, out_file=None):
+        if not self._should_show_version(args):
+            self._ensure_session_loaded()
+        return super(AzCli, self).invoke(args, initial_invocation_data=initial_invocation_data, out_file=out_file)
 
     def refresh_request_id(self):
         """Assign a new random GUID as x-ms-client-request-id
@@ -64,7 +102,7 @@ class AzCli(CLI):
         unique client-side request ID is generated.
         """
         import uuid
-        self.data['headers']['x-ms-client-request-id'] = str(uuid.uuid1())
+        self.data['headers']['x-ms-client-request-id'] = str(uuid.uuid4())
 
     def get_progress_controller(self, det=False):
         import azure.cli.core.commands.progress as progress
@@ -83,12 +121,137 @@ class AzCli(CLI):
         return handle_exception(ex)
 
 
+def _is_debug_logging_enabled():
+    """ knack sets the loggers to DEBUG and filters the records in their handlers, depending on --debug and
+    whether file logging is enabled. So the levels of the handlers a debug record would reach are checked. """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return False
+    current = logger
+    while current:
+        if any(handler.level <= logging.DEBUG for handler in current.handlers):
+            return True
+        current = current.parent if current.propagate else None
+    return False
+
+
+def _get_command_index_key(mods_ns_path, extensions):
+    """ Identifies the installed command modules and extensions the command index was built for. Adding or
+    removing a command module changes the modification time of its namespace package directory. """
+    key = [__version__, sorted(extensions)]
+    for path in mods_ns_path:
+        try:
+            key.append([path, os.stat(path).st_mtime])
+        except OSError:
+            pass
+    return key
+
+
+_COMMAND_MODULE_PACKAGES = {}
+
+
+def _list_command_module_packages(path):
+    """ Lists the packages in one directory of the command modules namespace package. The listing is cached
+    for the process, keyed on the modification time of the directory. """
+    try:
+        cache_key = (path, os.stat(path).st_mtime)
+    except OSError:
+        return []
+    if cache_key not in _COMMAND_MODULE_PACKAGES:
+        _COMMAND_MODULE_PACKAGES[cache_key] = sorted(
+            name for name in os.listdir(path)
+            if '.' not in name and os.path.isfile(os.path.join(path, name, '__init__.py')))
+    return _COMMAND_MODULE_PACKAGES[cache_key]
+
+
+def _get_installed_command_modules(mods_ns_path):
+    from azure.cli.core.commands import BLACKLISTED_MODS
+
+    installed_command_modules = []
+    seen = set(BLACKLISTED_MODS)
+    for path in mods_ns_path:
+        for modname in _list_command_module_packages(path):
+            if modname not in seen:
+                seen.add(modname)
+                installed_command_modules.append(modname)
+    return installed_command_modules
+
+
+def _get_indexed_command_modules(root_command, index_key, partial=False):
+    """ Returns the command modules providing `root_command` or None if the command index can't tell. When
+    `partial` is set, `root_command` is still being typed and the modules providing every root command it is a
+    prefix of are returned. """
+    from azure.cli.core._session import INDEX
+
+    if not root_command or INDEX.get('key') != index_key:
+        return None
+    command_index = INDEX.get('commandIndex', {})
+    if not partial:
+        return command_index.get(root_command)
+    matches = [name for name in command_index if name.startswith(root_command)]
+    if not matches:
+        return None
+    return sorted(set(mod for name in matches for mod in command_index[name]))
+
+
+def _update_command_index(command_table, cmd_to_mod_map, index_key):
+    """ Rebuilds the command index, which maps each lower case root command to the command modules that provide
+    it. Root commands only provided by extensions map to an empty list. """
+    from azure.cli.core._session import INDEX
+
+    command_index = {}
+    for cmd_name in command_table:
+        mods = command_index.setdefault(cmd_name.split(' ', 1)[0].lower(), [])
+        mod = cmd_to_mod_map.get(cmd_name)
+        if mod and mod not in mods:
+            mods.append(mod)
+    if INDEX.get('key') == index_key and INDEX.get('commandIndex') == command_index:
+        return
+    INDEX.data = {'key': index_key, 'commandIndex': command_index}
+    INDEX.save_with_retry()
+
+
+def _get_extension_names():
+    """ Lists the installed extensions. A broken extensions directory leaves the built-in commands working. """
+    import traceback
+    from azure.cli.core.extension import get_extension_names
+
+    try:
+        return get_extension_names()
+    except Exception:  # pylint: disable=broad-except
+        logger.warning("Unable to load extensions. Use --debug for more information.")
+        logger.debug(traceback.format_exc())
+        return []
+
+
+def _get_command_modules_ns_path():
+    from importlib import import_module
+
+    try:
+        return import_module('azure.cli.command_modules').__path__
+    except ImportError:
+        return []
+
+
+def _report_command_module_failures(failures):
+    import azure.cli.core.telemetry as telemetry
+
+    # Changing this error message requires updating CI script that checks for failed
+    # module loading.
+    logger.error("Error loading command module(s) %s", ', '.join("'{}'".format(mod) for mod, _, _, _ in failures))
+    telemetry.set_exceptions([(ex, 'module-load-error-' + mod, 'Error loading module: {}'.format(mod), tb)
+                              for mod, ex, tb, _ in failures])
+    for _, _, _, formatted_tb in failures:
+        if formatted_tb:
+            logger.debug(formatted_tb)
+
+
 class MainCommandsLoader(CLICommandsLoader):
 
     def __init__(self, cli_ctx=None):
         super(MainCommandsLoader, self).__init__(cli_ctx)
         self.cmd_to_loader_map = {}
         self.loaders = []
+        self._common_args_registered = False
 
     def _update_command_definitions(self):
         for cmd_name in self.command_table:
@@ -97,89 +260,113 @@ class MainCommandsLoader(CLICommandsLoader):
                 loader.command_table = self.command_table
                 loader._update_command_definitions()  # pylint: disable=protected-access
 
-    def load_command_table(self, args):
-        from importlib import import_module
-        import pkgutil
+    def _is_completing_root_command(self, args):
+        """ `az --version` never loads the command table, but tab completion does. While the root command is still
+        being typed, the candidates are all the root commands starting with it. """
+        return bool(self.cli_ctx.data['completer_active'] and args and len(args) == 1 and
+                    not os.environ.get('COMP_LINE', '').endswith(' '))
+
+    def _find_indexed_command_modules(self, args, index_key):
+        """ Looks up the command modules to load for `args` in the command index. Returns None when all the
+        command modules have to be loaded. """
+        # the command index is keyed on lower case root commands so that a miscased command doesn't cause all
+        # command modules to be loaded
+        root_command = args[0].lower() if args else None
+        indexed_modules = _get_indexed_command_modules(root_command, index_key,
+                                                       partial=self._is_completing_root_command(args))
+        if indexed_modules is not None:
+            logger.debug("Found root command '%s' in the command index: %s", root_command, indexed_modules)
+        return indexed_modules
+
+    def _load_command_modules(self, args, command_modules, debug_enabled):
+        """ Loads the command tables of `command_modules` in order. Returns the map of each loaded command to its
+        command module and the names of the command modules that failed to load. """
         import traceback
-        from azure.cli.core.commands import (
-            _load_module_command_loader, _load_extension_command_loader, BLACKLISTED_MODS, ExtensionCommandSource)
-        from azure.cli.core.extension import (
-            get_extension_names, get_extension_path, get_extension_modname)
+        from azure.cli.core.commands import _load_module_command_loader
 
         cmd_to_mod_map = {}
-
-        def _update_command_table_from_modules(args):
-            '''Loads command table(s)
-            When `module_name` is specified, only commands from that module will be loaded.
-            If the module is not found, all commands are loaded.
-            '''
-            installed_command_modules = []
+        failures = []
+        start_time = timeit.default_timer() if debug_enabled else None
+        for mod in command_modules:
             try:
-                mods_ns_pkg = import_module('azure.cli.command_modules')
-                installed_command_modules = [modname for _, modname, _ in
-                                             pkgutil.iter_modules(mods_ns_pkg.__path__)
-                                             if modname not in BLACKLISTED_MODS]
-            except ImportError:
-                pass
-            logger.debug('Installed command modules %s', installed_command_modules)
-            cumulative_elapsed_time = 0
-            for mod in [m for m in installed_command_modules if m not in BLACKLISTED_MODS]:
-                try:
-                    start_time = timeit.default_timer()
-                    module_command_table = _load_module_command_loader(self, args, mod)
-                    self.command_table.update(module_command_table)
-                    cmd_to_mod_map.update({cmd: mod for cmd in list(module_command_table.keys())})
-                    elapsed_time = timeit.default_timer() - start_time
-                    logger.debug("Loaded module '%s' in %.3f seconds.", mod, elapsed_time)
-                    cumulative_elapsed_time += elapsed_time
-                except Exception as ex:  # pylint: disable=broad-except
-                    # Changing this error message requires updating CI script that checks for failed
-                    # module loading.
-                    import azure.cli.core.telemetry as telemetry
-                    logger.error("Error loading command module '%s'", mod)
-                    telemetry.set_exception(exception=ex, fault_type='module-load-error-' + mod,
-                                            summary='Error loading module: {}'.format(mod))
-                    logger.debug(traceback.format_exc())
+                module_start_time = timeit.default_timer() if debug_enabled else None
+                module_command_table = _load_module_command_loader(self, args, mod)
+                self.command_table.update(module_command_table)
+                cmd_to_mod_map.update(dict.fromkeys(module_command_table, mod))
+                if debug_enabled:
+                    logger.debug("Loaded module '%s' in %.3f seconds.", mod,
+                                 timeit.default_timer() - module_start_time)
+            except Exception as ex:  # pylint: disable=broad-except
+                failures.append((mod, ex, sys.exc_info()[2], traceback.format_exc() if debug_enabled else None))
+        if failures:
+            _report_command_module_failures(failures)
+        if debug_enabled:
             logger.debug("Loaded all modules in %.3f seconds. "
                          "(note: there's always an overhead with the first module loaded)",
-                         cumulative_elapsed_time)
+                         timeit.default_timer() - start_time)
+        return cmd_to_mod_map, [mod for mod, _, _, _ in failures]
 
-        def _update_command_table_from_extensions():
+    def _load_extensions(self, args, extensions, cmd_to_mod_map, debug_enabled):
+        import pkgutil
+        import traceback
+        from azure.cli.core.commands import _load_extension_command_loader, ExtensionCommandSource
+        from azure.cli.core.extension import get_extension_path, get_extension_modname
 
-            extensions = get_extension_names()
-            if extensions:
-                logger.debug("Found %s extensions: %s", len(extensions), extensions)
-                for ext_name in extensions:
-                    ext_dir = get_extension_path(ext_name)
+        logger.debug("Found %s extensions: %s", len(extensions), extensions)
+        for ext_name in extensions:
+            try:
+                ext_dir = get_extension_path(ext_name)
+                # every sys.path entry slows down later imports, so don't add the same directory twice when
+                # the command table is loaded more than once in a process
+                if ext_dir not in sys.path:
                     sys.path.append(ext_dir)
-                    try:
-                        ext_mod = get_extension_modname(ext_name, ext_dir=ext_dir)
-                        # Add to the map. This needs to happen before we load commands as registering a command
-                        # from an extension requires this map to be up-to-date.
-                        # self._mod_to_ext_map[ext_mod] = ext_name
-                        start_time = timeit.default_timer()
-                        extension_command_table = _load_extension_command_loader(self, args, ext_mod)
-
-                        for cmd_name, cmd in extension_command_table.items():
-                            cmd.command_source = ExtensionCommandSource(
-                                extension_name=ext_name,
-                                overrides_command=cmd_name in cmd_to_mod_map)
-
-                        self.command_table.update(extension_command_table)
-                        elapsed_time = timeit.default_timer() - start_time
-                        logger.debug("Loaded extension '%s' in %.3f seconds.", ext_name, elapsed_time)
-                    except Exception:  # pylint: disable=broad-except
-                        logger.warning("Unable to load extension '%s'. Use --debug for more information.", ext_name)
-                        logger.debug(traceback.format_exc())
-
-        _update_command_table_from_modules(args)
-        try:
+                    # warm up sys.path_importer_cache with the directory's finder
+                    pkgutil.get_importer(ext_dir)
+                ext_mod = get_extension_modname(ext_name, ext_dir=ext_dir)
+                # Add to the map. This needs to happen before we load commands as registering a command
+                # from an extension requires this map to be up-to-date.
+                # self._mod_to_ext_map[ext_mod] = ext_name
+                start_time = timeit.default_timer() if debug_enabled else None
+                extension_command_table = _load_extension_command_loader(self, args, ext_mod)
+
+                for cmd_name, cmd in extension_command_table.items():
+                    cmd.command_source = ExtensionCommandSource(
+                        extension_name=ext_name,
+                        overrides_command=cmd_name in cmd_to_mod_map)
+
+                self.command_table.update(extension_command_table)
+                if debug_enabled:
+                    logger.debug("Loaded extension '%s' in %.3f seconds.", ext_name,
+                                 timeit.default_timer() - start_time)
+            except Exception:  # pylint: disable=broad-except
+                logger.warning("Unable to load extension '%s'. Use --debug for more information.", ext_name)
+                logger.debug(traceback.format_exc())
+
+    def load_command_table(self, args):
+        extensions = _get_extension_names()
+        # load times and tracebacks are only measured and formatted when they will be logged
+        debug_enabled = _is_debug_logging_enabled()
+
+        # When the root command is found in the command index, only the modules that provide it are loaded.
+        # Otherwise, all commands are loaded.
+        mods_ns_path = _get_command_modules_ns_path()
+        index_key = _get_command_index_key(mods_ns_path, extensions)
+        indexed_modules = self._find_indexed_command_modules(args, index_key)
+        if indexed_modules is None:
+            command_modules = _get_installed_command_modules(mods_ns_path)
+            logger.debug('Installed command modules %s', command_modules)
+        else:
+            command_modules = indexed_modules
+
+        cmd_to_mod_map, failed_modules = self._load_command_modules(args, command_modules, debug_enabled)
+        if extensions:
             # We always load extensions even if the appropriate module has been loaded
             # as an extension could override the commands already loaded.
-            _update_command_table_from_extensions()
-        except Exception:  # pylint: disable=broad-except
-            logger.warning("Unable to load extensions. Use --debug for more information.")
-            logger.debug(traceback.format_exc())
+            self._load_extensions(args, extensions, cmd_to_mod_map, debug_enabled)
+
+        # the commands of a module that failed to load would be missing from the index until it changes again
+        if indexed_modules is None and not failed_modules:
+            _update_command_index(self.command_table, cmd_to_mod_map, index_key)
 
         return self.command_table
 
@@ -190,21 +377,73 @@ class MainCommandsLoader(CLICommandsLoader):
         command_loaders = self.cmd_to_loader_map.get(command, None)
 
         if command_loaders:
-            with ArgumentsContext(self, '') as c:
-                c.argument('resource_group_name', resource_group_name_type)
-                c.argument('location', get_location_type(self.cli_ctx))
-                c.argument('deployment_name', deployment_name_type)
-                c.argument('cmd', ignore_type)
-
+            if not self._common_args_registered:
+                with ArgumentsContext(self, '') as c:
+                    c.argument('resource_group_name', resource_group_name_type)
+                    c.argument('location', get_location_type(self.cli_ctx))
+                    c.argument('deployment_name', deployment_name_type)
+                    c.argument('cmd', ignore_type)
+                self._common_args_registered = True
+
+            self.command_table[command].load_arguments()  # this loads the arguments via reflection
             for loader in command_loaders:
                 loader.command_name = command
-                self.command_table[command].load_arguments()  # this loads the arguments via reflection
                 loader.load_arguments(command)  # this adds entries to the argument registries
                 self.argument_registry.arguments.update(loader.argument_registry.arguments)
                 self.extra_argument_registry.update(loader.extra_argument_registry)
+            # apply the merged registries once every loader has contributed to them
+            for loader in command_loaders:
                 loader._update_command_definitions()  # pylint: disable=protected-access
 
 
+_RESOURCE_TYPE_PREFIXES = []
+
+# Doc strings applied from a command's doc_string_source, kept until the process exits
+_DOC_STRING_CACHE = {}
+
+
+def _get_resource_type_prefixes():
+    if not _RESOURCE_TYPE_PREFIXES:
+        from azure.cli.core.profiles import ResourceType
+        # longest prefix first, so that the most specific resource type wins the first match
+        _RESOURCE_TYPE_PREFIXES.extend(sorted(((rt, rt.import_prefix) for rt in ResourceType),
+                                              key=lambda prefix: len(prefix[1]), reverse=True))
+    return _RESOURCE_TYPE_PREFIXES
+
+
+def _resolve_op_handler(operation, profile, versioned_sdk_paths=None):
+    # Patch the unversioned sdk path to include the appropriate API version for the
+    # resource type in question.
+    from importlib import import_module
+    import types
+
+    from azure.cli.core.profiles._shared import get_versioned_sdk_path
+
+    versioned_sdk_paths = {} if versioned_sdk_paths is None else versioned_sdk_paths
+    for rt, import_prefix in _get_resource_type_prefixes():
+        if operation.startswith(import_prefix):
+            operation_group = None
+            if operation.startswith(import_prefix + ".operations."):
+                subs = operation[len(import_prefix + ".operations."):]
+                operation_group = subs[:subs.index('_operations')]
+            key = (profile, rt, operation_group)
+            if key not in versioned_sdk_paths:
+                versioned_sdk_paths[key] = get_versioned_sdk_path(profile, rt, operation_group=operation_group)
+            operation = operation.replace(import_prefix, versioned_sdk_paths[key])
+            break
+
+    try:
+        mod_to_import, attr_path = operation.split('#')
+        op = import_module(mod_to_import)
+        for part in attr_path.split('.'):
+            op = getattr(op, part)
+        if isinstance(op, types.FunctionType):
+            return op
+        return six.get_method_function(op)
+    except (ValueError, AttributeError):
+        raise ValueError("The operation '{}' is invalid.".format(operation))
+
+
 class AzCommandsLoader(CLICommandsLoader):
 
     def __init__(self, cli_ctx=None, min_profile=None, max_profile='latest',
@@ -220,6 +459,10 @@ class AzCommandsLoader(CLICommandsLoader):
         self.module_kwargs = kwargs
         self._command_group_cls = command_group_cls or AzCommandGroup
         self._argument_context_cls = argument_context_cls or AzArgumentContext
+        # resolved operation handlers, keyed by operation and API profile
+        self._op_handler_cache = {}
+        # versioned SDK paths, keyed by API profile, resource type and operation group
+        self._versioned_sdk_paths = {}
 
     def _update_command_definitions(self):
         master_arg_registry = self.cli_ctx.invocation.commands_loader.argument_registry
@@ -230,12 +473,24 @@ class AzCommandsLoader(CLICommandsLoader):
             for argument_name, argument_definition in master_extra_arg_registry[command_name].items():
                 command.arguments[argument_name] = argument_definition
 
+            if not command.arguments:
+                continue
+
+            # Same resolution as ArgumentRegistry.get_cli_argument, but the registration scopes that apply to the
+            # command (e.g. '', 'vm', 'vm create') are looked up once instead of once per argument.
+            parts = command_name.split()
+            scopes = [master_arg_registry.arguments[probe]
+                      for probe in (' '.join(parts[:index]) for index in range(len(parts) + 1))
+                      if probe in master_arg_registry.arguments]
             for argument_name in command.arguments:
-                overrides = master_arg_registry.get_cli_argument(command_name, argument_name)
+                overrides = CLIArgumentType()
+                for scope in scopes:
+                    override = scope.get(argument_name, None)
+                    if override:
+                        overrides.update(override)
                 command.update_argument(argument_name, overrides)
 
     def _apply_doc_string(self, dest, command_kwargs):
-        from azure.cli.core.profiles._shared import APIVersionException
         doc_string_source = command_kwargs.get('doc_string_source', None)
         if not doc_string_source:
             return
@@ -243,6 +498,17 @@ class AzCommandsLoader(CLICommandsLoader):
             raise CLIError("command authoring error: applying doc_string_source '{}' directly will cause slowdown. "
                            'Import by string name instead.'.format(doc_string_source.__name__))
 
+        # the source may resolve to a versioned SDK model, so the key includes what get_models depends on
+        resource_type = self._get_resource_type()
+        cache_key = (doc_string_source, resource_type, self.module_kwargs.get('operation_group', None),
+                     self.cli_ctx.cloud.profile if resource_type else None)
+        try:
+            dest.__doc__ = _DOC_STRING_CACHE[cache_key]
+            return
+        except KeyError:
+            pass
+
+        from azure.cli.core.profiles._shared import APIVersionException
         model = doc_string_source
         try:
             model = self.get_models(doc_string_source)
@@ -260,7 +526,7 @@ class AzCommandsLoader(CLICommandsLoader):
                 model = getattr(model, method_name, None)
         if not model:
             raise CLIError("command authoring error: source '{}' not found.".format(doc_string_source))
-        dest.__doc__ = model.__doc__
+        dest.__doc__ = _DOC_STRING_CACHE[cache_key] = model.__doc__
 
     def _get_resource_type(self):
         resource_type = self.module_kwargs.get('resource_type', None)
@@ -275,10 +541,10 @@ class AzCommandsLoader(CLICommandsLoader):
         return get_api_version(self.cli_ctx, resource_type)
 
     def supported_api_version(self, resource_type=None, min_api=None, max_api=None, operation_group=None):
-        from azure.cli.core.profiles import supported_api_version, PROFILE_TYPE
         if not min_api and not max_api:
             # optimistically assume that fully supported if no api restriction listed
             return True
+        from azure.cli.core.profiles import supported_api_version, PROFILE_TYPE
         api_support = supported_api_version(
             cli_ctx=self.cli_ctx,
             resource_type=resource_type or self._get_resource_type() or PROFILE_TYPE,
@@ -321,75 +587,62 @@ class AzCommandsLoader(CLICommandsLoader):
 
         name = ' '.join(name.split())
 
-        client_factory = kwargs.get('client_factory', None)
-
-        def default_command_handler(command_args):
-            from azure.cli.core.util import get_arg_list
-            op = handler or self.get_op_handler(operation)
-            op_args = get_arg_list(op)
-
-            client = client_factory(self.cli_ctx, command_args) if client_factory else None
-            if client:
-                client_arg_name = kwargs.get('client_arg_name',
-                                             'client' if operation.startswith(('azure.cli', 'azext')) else 'self')
-                if client_arg_name in op_args:
-                    command_args[client_arg_name] = client
-            result = op(**command_args)
-            return result
-
-        def default_arguments_loader():
-            op = handler or self.get_op_handler(operation)
-            self._apply_doc_string(op, kwargs)
-            cmd_args = list(extract_args_from_signature(op, excluded_params=self.excluded_command_handler_args))
-            return cmd_args
-
-        def default_description_loader():
-            op = handler or self.get_op_handler(operation)
-            self._apply_doc_string(op, kwargs)
-            return extract_full_summary_from_signature(op)
-
-        kwargs['arguments_loader'] = argument_loader or default_arguments_loader
-        kwargs['description_loader'] = description_loader or default_description_loader
-
-        if self.supported_api_version(resource_type=kwargs.get('resource_type'),
-                                      min_api=kwargs.get('min_api'),
-                                      max_api=kwargs.get('max_api'),
-                                      operation_group=kwargs.get('operation_group')):
-            self.command_table[name] = self.command_cls(self, name,
-                                                        handler or default_command_handler,
-                                                        **kwargs)
+        # bound methods are used rather than closures to keep per-command allocations down
+        kwargs['arguments_loader'] = argument_loader or functools.partial(
+            self._default_arguments_loader, operation, handler, kwargs)
+        kwargs['description_loader'] = description_loader or functools.partial(
+            self._default_description_loader, operation, handler, kwargs)
+        if not handler:
+            handler = functools.partial(self._default_command_handler, operation, kwargs)
+
+        min_api = kwargs.get('min_api')
+        max_api = kwargs.get('max_api')
+        # most commands carry no API restriction, in which case they are always supported
+        if (not min_api and not max_api) or self.supported_api_version(resource_type=kwargs.get('resource_type'),
+                                                                       min_api=min_api,
+                                                                       max_api=max_api,
+                                                                       operation_group=kwargs.get('operation_group')):
+            self.command_table[name] = self.command_cls(self, name, handler, **kwargs)
+
+    def _resolve_command_op(self, operation, handler, command_kwargs):
+        """ Resolves the callable behind a command and applies its doc string """
+        op = handler or self.get_op_handler(operation)
+        self._apply_doc_string(op, command_kwargs)
+        return op
+
+    def _default_command_handler(self, operation, command_kwargs, command_args):
+        from azure.cli.core.util import get_arg_list
+        op = self.get_op_handler(operation)
+        op_args = get_arg_list(op)
+
+        client_factory = command_kwargs.get('client_factory', None)
+        client = client_factory(self.cli_ctx, command_args) if client_factory else None
+        if client:
+            client_arg_name = command_kwargs.get('client_arg_name',
+                                                 'client' if operation.startswith(('azure.cli', 'azext')) else 'self')
+            if client_arg_name in op_args:
+                command_args[client_arg_name] = client
+        result = op(**command_args)
+        return result
+
+    def _default_arguments_loader(self, operation, handler, command_kwargs):
+        op = self._resolve_command_op(operation, handler, command_kwargs)
+        cmd_args = list(extract_args_from_signature(op, excluded_params=self.excluded_command_handler_args))
+        return cmd_args
+
+    def _default_description_loader(self, operation, handler, command_kwargs):
+        op = self._resolve_command_op(operation, handler, command_kwargs)
+        return extract_full_summary_from_signature(op)
 
     def get_op_handler(self, operation):
         """ Import and load the operation handler """
-        # Patch the unversioned sdk path to include the appropriate API version for the
-        # resource type in question.
-        from importlib import import_module
-        import types
-
-        from azure.cli.core.profiles import ResourceType
-        from azure.cli.core.profiles._shared import get_versioned_sdk_path
-
-        for rt in ResourceType:
-            if operation.startswith(rt.import_prefix + ".operations."):
-                subs = operation[len(rt.import_prefix + ".operations."):]
-                operation_group = subs[:subs.index('_operations')]
-                operation = operation.replace(
-                    rt.import_prefix,
-                    get_versioned_sdk_path(self.cli_ctx.cloud.profile, rt, operation_group=operation_group))
-            elif operation.startswith(rt.import_prefix):
-                operation = operation.replace(rt.import_prefix,
-                                              get_versioned_sdk_path(self.cli_ctx.cloud.profile, rt))
-
+        profile = self.cli_ctx.cloud.profile
         try:
-            mod_to_import, attr_path = operation.split('#')
-            op = import_module(mod_to_import)
-            for part in attr_path.split('.'):
-                op = getattr(op, part)
-            if isinstance(op, types.FunctionType):
-                return op
-            return six.get_method_function(op)
-        except (ValueError, AttributeError):
-            raise ValueError("The operation '{}' is invalid.".format(operation))
+            return self._op_handler_cache[(operation, profile)]
+        except KeyError:
+            op = self._op_handler_cache[(operation, profile)] = _resolve_op_handler(
+                operation, profile, self._versioned_sdk_paths)
+            return op
 
 
 def get_default_cli():
@@ -11,8 +11,28 @@ try:
 except ImportError:
     import collections
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from codecs import open as codecs_open, BOM_UTF8
 
-from codecs import open as codecs_open
+
+def _read_json(filename, encoding):
+    # orjson only decodes UTF-8, which is what the session files are written in by default
+    if orjson and encoding in ('utf-8', 'utf-8-sig'):
+        with open(filename, 'rb') as f:
+            content = f.read()
+        if content.startswith(BOM_UTF8):
+            content = content[len(BOM_UTF8):]
+        try:
+            return orjson.loads(content)
+        except ValueError:
+            # e.g. NaN or integers wider than 64 bits, which json accepts but orjson doesn't
+            pass
+    with codecs_open(filename, 'r', encoding=encoding) as f:
+        return json.load(f)
 
 
 class Session(collections.MutableMapping):
@@ -36,8 +56,7 @@ class Session(collections.MutableMapping):
                 st = os.stat(self.filename)
                 if st.st_mtime + max_age < time.clock():
                     self.save()
-            with codecs_open(self.filename, 'r', encoding=self._encoding) as f:
-                self.data = json.load(f)
+            self.data = _read_json(self.filename, self._encoding)
         except (OSError, IOError):
             self.save()
 
@@ -77,6 +96,44 @@ class Session(collections.MutableMapping):
         return len(self.data)
 
 
+class CommandIndex(Session):  # pylint: disable=too-many-ancestors
+    '''A Session for the command index, which can always be rebuilt from the installed command modules.
+
+    An unreadable index is treated as empty and the index is replaced as a whole when saved, so that an
+    interrupted save can't leave a truncated file behind.
+    '''
+
+    def load(self, filename, max_age=0):
+        try:
+            super(CommandIndex, self).load(filename, max_age=max_age)
+        except ValueError:
+            # corrupt or truncated file
+            self.data = {}
+        if not isinstance(self.data, dict):
+            self.data = {}
+
+    def save(self):
+        if not self.filename:
+            return
+        import tempfile
+        fd, tmp_filename = tempfile.mkstemp(dir=os.path.dirname(self.filename),
+                                            prefix=os.path.basename(self.filename) + '.', suffix='.tmp')
+        os.close(fd)
+        try:
+            with codecs_open(tmp_filename, 'w', encoding=self._encoding) as f:
+                json.dump(self.data, f)
+            if hasattr(os, 'replace'):
+                os.replace(tmp_filename, self.filename)
+            else:
+                # Python 2 has no os.replace and os.rename doesn't overwrite existing files on Windows
+                if os.path.exists(self.filename):
+                    os.remove(self.filename)
+                os.rename(tmp_filename, self.filename)
+        finally:
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
+
+
 # ACCOUNT contains subscriptions information
 ACCOUNT = Session()
 
@@ -85,3 +142,6 @@ CONFIG = Session()
 
 # SESSION provides read-write session variables
 SESSION = Session()
+
+# INDEX contains the command index, which maps root commands to the command modules that provide them
+INDEX = CommandIndex()
@@ -40,7 +40,7 @@ class TelemetrySession(object):  # pylint: disable=too-many-instance-attributes
     module_correlation = None
     extension_name = 'None'
 
-    def add_exception(self, exception, fault_type, description=None, message=''):
+    def add_exception(self, exception, fault_type, description=None, message='', ex_traceback=None):
         details = {
             'Reserved.DataModel.EntityType': 'Fault',
             'Reserved.DataModel.Fault.Description': description or fault_type,
@@ -48,7 +48,7 @@ class TelemetrySession(object):  # pylint: disable=too-many-instance-attributes
             'Reserved.DataModel.Fault.TypeString': exception.__class__.__name__,
             'Reserved.DataModel.Fault.Exception.Message': _remove_cmd_chars(
                 message or str(exception)),
-            'Reserved.DataModel.Fault.Exception.StackTrace': _remove_cmd_chars(_get_stack_trace())
+            'Reserved.DataModel.Fault.Exception.StackTrace': _remove_cmd_chars(_get_stack_trace(ex_traceback))
         }
         fault_type = _remove_symbols(fault_type).replace('"', '').replace("'", '').replace(' ', '-')
         fault_name = '{}/commands/{}'.format(PRODUCT_NAME, fault_type.lower())
@@ -219,6 +219,17 @@ def set_exception(exception, fault_type, summary=None):
     _session.add_exception(exception, fault_type=fault_type, description=summary)
 
 
+@decorators.suppress_all_exceptions(raise_in_diagnostics=True)
+def set_exceptions(exceptions):
+    """ Record several exceptions at once.
+
+    :param exceptions: (exception, fault_type, summary, traceback) tuples. The traceback is used for the stack trace
+                       since the exceptions are no longer being handled when they are recorded.
+    """
+    for exception, fault_type, summary, ex_traceback in exceptions:
+        _session.add_exception(exception, fault_type=fault_type, description=summary, ex_traceback=ex_traceback)
+
+
 @decorators.suppress_all_exceptions(raise_in_diagnostics=True)
 def set_failure(summary=None):
     if _session.result != 'None':
@@ -283,9 +294,19 @@ def _get_core_version():
     return core_version
 
 
+def _is_session_loaded():
+    # `az --version` doesn't load the session files or the active cloud, which building a Profile requires
+    return getattr(_session.application, 'session_loaded', True)
+
+
 @decorators.suppress_all_exceptions(fallback_return=None)
 def _get_installation_id():
-    return _get_profile().get_installation_id()
+    if _is_session_loaded():
+        return _get_profile().get_installation_id()
+    from azure.cli.core._profile import _INSTALLATION_ID
+    from azure.cli.core._session import ACCOUNT
+    ACCOUNT.load(os.path.join(_session.application.config.config_dir, 'azureProfile.json'))
+    return ACCOUNT.get(_INSTALLATION_ID)
 
 
 @decorators.call_once
@@ -318,6 +339,8 @@ def _get_hash_machine_id():
 @decorators.suppress_all_exceptions(fallback_return='')
 @decorators.hash256_result
 def _get_user_azure_id():
+    if not _is_session_loaded():
+        return ''
     return _get_profile().get_current_account_user()
 
 
@@ -328,6 +351,8 @@ def _get_env_string():
 
 @decorators.suppress_all_exceptions(fallback_return=None)
 def _get_azure_subscription_id():
+    if not _is_session_loaded():
+        return None
     return _get_profile().get_subscription_id()
 
 
@@ -350,7 +375,7 @@ def _get_error_hash():
 
 
 @decorators.suppress_all_exceptions(fallback_return='')
-def _get_stack_trace():
+def _get_stack_trace(ex_traceback=None):
     def _get_root_path():
         dir_path = os.path.dirname(os.path.realpath(__file__))
         head, tail = os.path.split(dir_path)
@@ -365,7 +390,7 @@ def _get_stack_trace():
         frames = [p.replace(root, '') for p in s]
         return str([site_package_regex.sub('site-packages\\\\', f) for f in frames])
 
-    _, _, ex_traceback = sys.exc_info()
+    ex_traceback = ex_traceback or sys.exc_info()[2]
     trace = traceback.format_tb(ex_traceback)
     return _remove_cmd_chars(_remove_symbols(_remove_root_paths(trace)))
 
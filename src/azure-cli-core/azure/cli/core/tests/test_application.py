@@ -55,6 +55,13 @@ class TestApplication(unittest.TestCase):
         self.assertIn('x-ms-client-request-id', cli.data['headers'])
         self.assertNotEquals(old_id, cli.data['headers']['x-ms-client-request-id'])
 
+    def test_session_is_not_loaded_when_showing_version(self):
+        cli = TestCli()
+        with mock.patch.object(cli, 'show_version') as version_mock:
+            cli.invoke(['--version'])
+        version_mock.assert_called_once_with()
+        self.assertFalse(cli.session_loaded)
+
     def test_application_register_and_call_handlers(self):
         handler_called = [False]
 
@@ -10,6 +10,7 @@ import unittest
 
 from azure.cli.core import AzCommandsLoader, MainCommandsLoader
 from azure.cli.core.commands import ExtensionCommandSource
+from azure.cli.core._session import Session
 from azure.cli.core.extension import EXTENSIONS_MOD_PREFIX
 from azure.cli.testsdk import TestCli
 
@@ -144,8 +145,8 @@ class TestCommandRegistration(unittest.TestCase):
         mock_obj.__path__ = __name__
         return mock_obj
 
-    def _mock_iter_modules(_):
-        return [(None, __name__, None)]
+    def _mock_installed_command_modules(_):
+        return [__name__]
 
     def _mock_extension_modname(ext_name, ext_dir):
         return ext_name
@@ -196,7 +197,7 @@ class TestCommandRegistration(unittest.TestCase):
         return module_command_table
 
     @mock.patch('importlib.import_module', _mock_import_lib)
-    @mock.patch('pkgutil.iter_modules', _mock_iter_modules)
+    @mock.patch('azure.cli.core._get_installed_command_modules', _mock_installed_command_modules)
     @mock.patch('azure.cli.core.commands._load_command_loader', _mock_load_command_loader)
     @mock.patch('azure.cli.core.extension.get_extension_modname', _mock_extension_modname)
     @mock.patch('azure.cli.core.extension.get_extension_names', _mock_get_extension_names)
@@ -217,6 +218,239 @@ class TestCommandRegistration(unittest.TestCase):
         self.assertTrue(isinstance(ext2.command_source, ExtensionCommandSource))
         self.assertTrue(ext2.command_source.overrides_command)
 
+        # loading the command table again doesn't add the extension directories to sys.path twice
+        sys_path_len = len(sys.path)
+        cli.loader.load_command_table(None)
+        self.assertEqual(len(sys.path), sys_path_len)
+
+    @mock.patch('importlib.import_module', _mock_import_lib)
+    @mock.patch('azure.cli.core._get_installed_command_modules', _mock_installed_command_modules)
+    @mock.patch('azure.cli.core.commands._load_command_loader', _mock_load_command_loader)
+    @mock.patch('azure.cli.core.extension.get_extension_modname', _mock_extension_modname)
+    @mock.patch('azure.cli.core.extension.get_extension_names', lambda: [])
+    @mock.patch('azure.cli.core._session.INDEX', Session())
+    def test_register_command_from_command_index(self):
+        from azure.cli.core._session import INDEX
+        cli = TestCli()
+
+        # the first load of an unknown root command loads all modules and builds the index
+        cmd_tbl = MainCommandsLoader(cli).load_command_table(['hello'])
+        self.assertIn('hello world', cmd_tbl)
+        self.assertEqual(INDEX['commandIndex'], {'hello': [__name__]})
+
+        # subsequent loads only load the indexed modules
+        with mock.patch('azure.cli.core._get_installed_command_modules') as installed_mods_mock:
+            cmd_tbl = MainCommandsLoader(cli).load_command_table(['hello'])
+            self.assertIn('hello world', cmd_tbl)
+            # the lookup is case insensitive
+            cmd_tbl = MainCommandsLoader(cli).load_command_table(['Hello'])
+            self.assertIn('hello world', cmd_tbl)
+            installed_mods_mock.assert_not_called()
+
+    @mock.patch('importlib.import_module', _mock_import_lib)
+    @mock.patch('azure.cli.core._get_installed_command_modules', _mock_installed_command_modules)
+    @mock.patch('azure.cli.core.commands._load_command_loader', _mock_load_command_loader)
+    @mock.patch('azure.cli.core.extension.get_extension_names', side_effect=OSError('permission denied'))
+    @mock.patch('azure.cli.core._session.INDEX', Session())
+    def test_register_command_with_broken_extensions_dir(self, _):
+        cli = TestCli()
+        with mock.patch('azure.cli.core.logger.warning') as warning_mock:
+            cmd_tbl = MainCommandsLoader(cli).load_command_table(['hello'])
+        self.assertIn('hello world', cmd_tbl)
+        warning_mock.assert_called_once_with("Unable to load extensions. Use --debug for more information.")
+
+    @mock.patch('importlib.import_module', _mock_import_lib)
+    @mock.patch('azure.cli.core._get_installed_command_modules', lambda _: [__name__, 'broken_mod'])
+    @mock.patch('azure.cli.core.commands._load_command_loader', _mock_load_command_loader)
+    @mock.patch('azure.cli.core.extension.get_extension_names', lambda: [])
+    @mock.patch('azure.cli.core._session.INDEX', Session())
+    def test_command_index_is_not_built_when_a_module_fails_to_load(self):
+        from azure.cli.core import commands
+        from azure.cli.core._session import INDEX
+        load_command_loader = commands._load_command_loader
+
+        def _load_command_loader(loader, args, name, prefix):
+            if name == 'broken_mod':
+                raise ImportError('broken_mod')
+            return load_command_loader(loader, args, name, prefix)
+
+        cli = TestCli()
+        with mock.patch('azure.cli.core.commands._load_command_loader', _load_command_loader), \
+                mock.patch('azure.cli.core.logger.error'):
+            cmd_tbl = MainCommandsLoader(cli).load_command_table(['hello'])
+        self.assertIn('hello world', cmd_tbl)
+        self.assertNotIn('commandIndex', INDEX.data)
+
+    def test_command_index_is_rebuilt_from_corrupt_file(self):
+        import json
+        import os
+        import shutil
+        import tempfile
+        from codecs import open as codecs_open
+        from azure.cli.core._session import CommandIndex
+
+        index_dir = tempfile.mkdtemp()
+        try:
+            index_file = os.path.join(index_dir, 'commandIndex.json')
+            for content in ['{"key": ["2.0.0"], "commandInd', '["hello"]']:
+                with open(index_file, 'w') as f:
+                    f.write(content)
+                index = CommandIndex()
+                index.load(index_file)
+                self.assertEqual(index.data, {})
+
+                # the index is replaced as a whole without leaving temporary files behind
+                index.data = {'key': ['2.0.0'], 'commandIndex': {'hello': ['hello']}}
+                index.save_with_retry()
+                with codecs_open(index_file, 'r', encoding='utf-8-sig') as f:
+                    self.assertEqual(json.load(f), index.data)
+                self.assertEqual(os.listdir(index_dir), ['commandIndex.json'])
+        finally:
+            shutil.rmtree(index_dir)
+
+    @mock.patch('importlib.import_module', _mock_import_lib)
+    @mock.patch('azure.cli.core._get_installed_command_modules', lambda _: ['mod_a', 'mod_b'])
+    @mock.patch('azure.cli.core.extension.get_extension_names', lambda: [])
+    @mock.patch('azure.cli.core._session.INDEX', Session())
+    def test_later_command_module_overrides_command(self):
+
+        def _command_loader_cls(name):
+
+            class TestCommandsLoader(AzCommandsLoader):
+
+                def load_command_table(self, args):
+                    super(TestCommandsLoader, self).load_command_table(args)
+                    with self.command_group('hello', operations_tmpl='{}#TestCommandRegistration.{{}}'.format(__name__)) as g:
+                        g.command('world', 'sample_vm_get')
+                    return self.command_table
+
+            TestCommandsLoader.__name__ = name
+            return TestCommandsLoader
+
+        modules = {'azure.cli.command_modules.' + name: mock.MagicMock(COMMAND_LOADER_CLS=_command_loader_cls(name))
+                   for name in ['mod_a', 'mod_b']}
+        cli = TestCli()
+        main_loader = MainCommandsLoader(cli)
+        with mock.patch('azure.cli.core.commands.import_module', lambda name: modules[name]):
+            cmd_tbl = main_loader.load_command_table(['hello'])
+
+        # both the command table and the loader map hold the command from the module loaded last
+        command_loader = cmd_tbl['hello world'].loader
+        self.assertEqual(type(command_loader).__name__, 'mod_b')
+        self.assertEqual(main_loader.cmd_to_loader_map['hello world'], [command_loader])
+
+    @mock.patch('importlib.import_module', _mock_import_lib)
+    @mock.patch('azure.cli.core._get_installed_command_modules', _mock_installed_command_modules)
+    @mock.patch('azure.cli.core.commands._load_command_loader', _mock_load_command_loader)
+    @mock.patch('azure.cli.core.extension.get_extension_names', lambda: [])
+    @mock.patch('azure.cli.core._session.INDEX', Session())
+    def test_module_loads_are_only_timed_with_debug_logging(self):
+        import timeit
+
+        cli_logger = logging.getLogger('cli')
+        original_level = cli_logger.level
+        # knack leaves the loggers at DEBUG and filters in the console handler unless --debug is given.
+        # setLevel also clears the cached isEnabledFor results of the loggers below.
+        cli_logger.setLevel(logging.DEBUG)
+        try:
+            for handler_level, timed in [(logging.WARNING, False), (logging.DEBUG, True)]:
+                handler = logging.StreamHandler()
+                handler.setLevel(handler_level)
+                with mock.patch.object(cli_logger, 'handlers', [handler]), \
+                        mock.patch.object(cli_logger, 'propagate', False), \
+                        mock.patch('timeit.default_timer', side_effect=timeit.default_timer) as timer_mock:
+                    cmd_tbl = MainCommandsLoader(TestCli()).load_command_table(['hello'])
+                self.assertIn('hello world', cmd_tbl)
+                self.assertEqual(timer_mock.called, timed)
+        finally:
+            cli_logger.setLevel(original_level)
+
+    def test_get_indexed_command_modules_for_partial_root_command(self):
+        from azure.cli.core import _get_indexed_command_modules
+
+        index = Session()
+        index.data = {'key': ['key'], 'commandIndex': {'vm': ['vm'], 'vmss': ['vm'], 'vnet': ['network'],
+                                                       'webapp': ['appservice']}}
+        with mock.patch('azure.cli.core._session.INDEX', index):
+            self.assertEqual(_get_indexed_command_modules('vm', ['key']), ['vm'])
+            self.assertEqual(_get_indexed_command_modules('v', ['key'], partial=True), ['network', 'vm'])
+            self.assertEqual(_get_indexed_command_modules('vms', ['key'], partial=True), ['vm'])
+            self.assertIsNone(_get_indexed_command_modules('x', ['key'], partial=True))
+            self.assertIsNone(_get_indexed_command_modules('v', ['other-key'], partial=True))
+
+    def test_get_installed_command_modules(self):
+        import os
+        import shutil
+        import tempfile
+        from azure.cli.core import _get_installed_command_modules
+
+        ns_dirs = [tempfile.mkdtemp(), tempfile.mkdtemp()]
+        try:
+            for ns_dir, pkgs in zip(ns_dirs, [['vm', 'context'], ['vm', 'network']]):
+                for pkg in pkgs:
+                    os.mkdir(os.path.join(ns_dir, pkg))
+                    open(os.path.join(ns_dir, pkg, '__init__.py'), 'w').close()
+            os.mkdir(os.path.join(ns_dirs[0], 'not_a_package'))
+            open(os.path.join(ns_dirs[0], 'module.py'), 'w').close()
+
+            # blacklisted modules and duplicates across the namespace package directories are skipped
+            self.assertEqual(_get_installed_command_modules(ns_dirs), ['vm', 'network'])
+        finally:
+            for ns_dir in ns_dirs:
+                shutil.rmtree(ns_dir)
+
+    def test_op_handler_is_resolved_once(self):
+        from azure.cli.core import _resolve_op_handler
+
+        cli = TestCli()
+        loader = AzCommandsLoader(cli)
+        operation = '{}#TestCommandRegistration.sample_vm_get'.format(__name__)
+        with mock.patch('azure.cli.core._resolve_op_handler', side_effect=_resolve_op_handler) as resolve_mock:
+            op = loader.get_op_handler(operation)
+            self.assertIs(loader.get_op_handler(operation), op)
+        self.assertIs(op, TestCommandRegistration.sample_vm_get)
+        self.assertEqual(resolve_mock.call_count, 1)
+
+    def test_versioned_sdk_path_is_resolved_once(self):
+        from azure.cli.core.profiles._shared import get_versioned_sdk_path
+
+        loader = AzCommandsLoader(TestCli())
+        operation_tmpl = 'azure.mgmt.resource.resources.operations.resource_groups_operations#ResourceGroupsOperations.{}'
+        with mock.patch('azure.cli.core.profiles._shared.get_versioned_sdk_path',
+                        side_effect=get_versioned_sdk_path) as path_mock:
+            get_op = loader.get_op_handler(operation_tmpl.format('get'))
+            list_op = loader.get_op_handler(operation_tmpl.format('list'))
+        self.assertEqual(get_op.__name__, 'get')
+        self.assertEqual(list_op.__name__, 'list')
+        self.assertEqual(path_mock.call_count, 1)
+
+    def test_doc_string_source_is_resolved_once(self):
+        import importlib
+
+        def _dest1():
+            pass
+
+        def _dest2():
+            pass
+
+        loader = AzCommandsLoader(TestCli())
+        command_kwargs = {'doc_string_source': '{}#TestCommandRegistration.sample_vm_get'.format(__name__)}
+        with mock.patch('importlib.import_module', side_effect=importlib.import_module) as import_mock:
+            loader._apply_doc_string(_dest1, command_kwargs)
+            loader._apply_doc_string(_dest2, command_kwargs)
+        self.assertEqual(_dest1.__doc__, TestCommandRegistration.sample_vm_get.__doc__)
+        self.assertEqual(_dest2.__doc__, TestCommandRegistration.sample_vm_get.__doc__)
+        self.assertEqual(import_mock.call_count, 1)
+
+    def test_command_name_whitespace_is_normalized(self):
+        loader = AzCommandsLoader(TestCli())
+        operation = '{}#TestCommandRegistration.sample_vm_get'.format(__name__)
+        for name in ['test register', ' test register ', 'test  register', 'test\tregister', 'test\n register',
+                     'test\rregister', 'test\x0bregister', 'test\x0cregister']:
+            loader.command_table = {}
+            loader._cli_command(name, operation=operation)
+            self.assertEqual(list(loader.command_table.keys()), ['test register'])
+
     def test_argument_with_overrides(self):
 
         global_vm_name_type = CLIArgumentType(
@@ -3,8 +3,11 @@
 # Licensed under the MIT License. See License.txt in the project root for license information.
 # --------------------------------------------------------------------------------------------
 
+import sys
 import unittest
 
+import mock
+
 
 class TestCoreTelemetry(unittest.TestCase):
     def test_suppress_all_exceptions(self):
@@ -13,6 +16,40 @@ class TestCoreTelemetry(unittest.TestCase):
         self._impl(ImportError, 'fallback_for_import_error')
         self._impl(None, None)
 
+    def test_set_exceptions_with_traceback(self):
+        import azure.cli.core.telemetry as telemetry
+
+        try:
+            raise ValueError('module failed to load')
+        except ValueError as ex:
+            failure = (ex, 'module-load-error-test', 'Error loading module: test', sys.exc_info()[2])
+
+        # the exception is recorded after it has been handled, the stack trace comes from the given traceback
+        with mock.patch.object(telemetry._session, 'exceptions', []):
+            telemetry.set_exceptions([failure])
+            self.assertEqual(len(telemetry._session.exceptions), 1)
+            name, details = telemetry._session.exceptions[0]
+        self.assertEqual(name, 'azurecli/commands/module-load-error-test')
+        self.assertIn('test_set_exceptions_with_traceback', details['Reserved.DataModel.Fault.Exception.StackTrace'])
+
+    def test_profile_is_not_built_before_the_session_is_loaded(self):
+        import azure.cli.core.telemetry as telemetry
+        from azure.cli.core._session import Session
+        from azure.cli.testsdk import TestCli
+
+        cli = TestCli()
+        account = Session()
+        account.data = {'installationId': 'test-installation-id'}
+        with mock.patch.object(telemetry._session, 'application', cli), \
+                mock.patch('azure.cli.core._session.ACCOUNT', account), \
+                mock.patch.object(account, 'load'), \
+                mock.patch('azure.cli.core._profile.Profile') as profile_mock:
+            self.assertEqual(telemetry._get_installation_id(), 'test-installation-id')
+            self.assertFalse(telemetry._get_user_azure_id())
+            self.assertIsNone(telemetry._get_azure_subscription_id())
+        profile_mock.assert_not_called()
+        self.assertFalse(cli.session_loaded)
+
     def _impl(self, exception_to_raise, fallback_return):
         from azure.cli.core.decorators import suppress_all_exceptions
 